@@ -10,7 +10,11 @@ Licensed under the MIT License, see LICENSE file for details
 
 
 import os
-import sys
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import skpy.astroeqs as eqs
@@ -22,6 +26,11 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from skpy.utilities.logger import fmLogger as mylog
 import fire
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, ASCII outputs are then parsed by pandas
+    njit = None
+
 
 # format for log
 PARA = "Parameter : {0:<20}\t = {1:<10}"
@@ -58,8 +67,270 @@ gamma = 5./3.
 qmu = 0.61
 qmue = 5*qmu/(2+qmu)
 mp = cons.m_p.cgs.value
+vardtype = np.float64  # default dtype of FermiData.read_var, float32 is enough for plotting
+_CM_TO_KPC = float(u.cm.to(u.kpc))  # 3.2407792896664E-22
+
+
+
+def _pow5_table():
+    """truncated 128-bit mantissas of 5**q for q in [-342, 308], as (high, low) pairs.
+
+    This is the table of the Eisel-Lemire algorithm, see Lemire, "Number Parsing at a
+    Gigabyte per Second", Software: Practice and Experience 51 (2021).
+    """
+
+    table = []
+    for q in range(-342, 309):
+        if q < 0:
+            power5 = 5**-q
+            z = power5.bit_length()
+            b = z + 127 if q >= -27 else 2*z + 128
+            c = 2**b // power5 + 1
+        else:
+            c = 5**q
+            while c < 1 << 127:
+                c <<= 1
+        while c >= 1 << 128:
+            c >>= 1
+        table += [c >> 64, c & (1 << 64) - 1]
+
+    return np.array(table, dtype=np.uint64)
+
+
+def _mul128(a, b):
+    """full 128-bit product of two uint64, as (high, low)."""
+
+    mask = np.uint64(0xFFFFFFFF)
+    s32 = np.uint64(32)
+    alo, ahi = a & mask, a >> s32
+    blo, bhi = b & mask, b >> s32
+    p0, p1, p2, p3 = alo*blo, alo*bhi, ahi*blo, ahi*bhi
+    mid = (p0 >> s32) + (p1 & mask) + (p2 & mask)
+    return p3 + (p1 >> s32) + (p2 >> s32) + (mid >> s32), (p0 & mask) | (mid << s32)
+
+
+def _to_double_bits(w, q, pow5):
+    """correctly rounded IEEE bits of w * 10**q with the Eisel-Lemire algorithm.
+
+    Returns -1 (all bits set) in the rare case the 128-bit product is not precise enough.
+    """
+
+    one = np.uint64(1)
+    if w == 0 or q < -342:
+        return np.uint64(0)
+    if q > 308:
+        return np.uint64(0x7FF0000000000000)
+
+    # normalize w so that its most significant bit is set.
+    lz = 0
+    while w >> np.uint64(63) == 0:
+        w <<= one
+        lz += 1
+
+    i = 2*(q+342)
+    hi, lo = _mul128(w, pow5[i])
+    if hi & np.uint64(0x1FF) == np.uint64(0x1FF):
+        hi2, lo2 = _mul128(w, pow5[i+1])
+        lo += hi2
+        if hi2 > lo:
+            hi += one
+    if lo == np.uint64(0xFFFFFFFFFFFFFFFF) and not -27 <= q <= 55:
+        return np.uint64(0xFFFFFFFFFFFFFFFF)
+
+    upperbit = np.int64(hi >> np.uint64(63))
+    mantissa = hi >> np.uint64(upperbit + 9)
+    power2 = ((217706*q) >> 16) + 63 + upperbit - lz + 1023
+
+    if power2 <= 0:  # subnormal
+        if -power2 + 1 >= 64:
+            return np.uint64(0)
+        mantissa >>= np.uint64(-power2 + 1)
+        mantissa += mantissa & one
+        mantissa >>= one
+        # rounding may carry into the smallest normal number, whose exponent bits are 1.
+        return mantissa
+
+    # exactly halfway between two doubles, round to even instead of up.
+    if lo <= one and -4 <= q <= 23 and mantissa & np.uint64(3) == one:
+        if mantissa << np.uint64(upperbit + 9) == hi:
+            mantissa &= ~one
+    mantissa += mantissa & one
+    mantissa >>= one
+    if mantissa >= np.uint64(2 << 52):
+        mantissa = np.uint64(1 << 52)
+        power2 += 1
+    mantissa &= ~np.uint64(1 << 52)
+
+    if power2 >= 0x7FF:
+        return np.uint64(0x7FF0000000000000)
+    return mantissa | (np.uint64(power2) << np.uint64(52))
+
+
+def _parse_ascii(buf, out, pow5):
+    """tokenize whitespace-separated floats in raw bytes, compiled by numba if available.
+
+    The decimal to binary conversion is correctly rounded, so the result is identical
+    to np.fromfile(sep=" ").
+
+    Args:
+        buf: numpy.ndarray
+            uint8 content of the file.
+        out: numpy.ndarray
+            preallocated uint64 view of the float64 array to be filled.
+        pow5: numpy.ndarray
+            the table from _pow5_table().
+
+    Returns:
+        n: int
+            the number of parsed values, -1 if the content is not recognized, does not
+            fit in out or cannot be converted exactly.
+    """
+
+    ten = np.uint64(10)
+    sign = np.uint64(1 << 63)
+    n = 0
+    i = 0
+    size = buf.size
+    while i < size:
+        c = buf[i]
+        if c == 32 or 9 <= c <= 13:  # whitespace
+            i += 1
+            continue
+
+        neg = c == 45
+        if c == 45 or c == 43:  # sign
+            i += 1
+
+        # value = w * 10**q, w holds at most 19 significant digits.
+        w = np.uint64(0)
+        nsig = 0
+        ndigit = 0
+        q = 0
+        while i < size and 48 <= buf[i] <= 57:
+            if nsig > 0 or buf[i] != 48:
+                if nsig == 19:
+                    return -1
+                w = w*ten + np.uint64(buf[i]-48)
+                nsig += 1
+            ndigit += 1
+            i += 1
+        if i < size and buf[i] == 46:  # decimal point
+            i += 1
+            while i < size and 48 <= buf[i] <= 57:
+                if nsig > 0 or buf[i] != 48:
+                    if nsig == 19:
+                        return -1
+                    w = w*ten + np.uint64(buf[i]-48)
+                    nsig += 1
+                q -= 1
+                ndigit += 1
+                i += 1
+        if ndigit == 0:
+            return -1
+
+        if i < size and ((buf[i] | 32) == 101 or (buf[i] | 32) == 100):  # e, E, d, D
+            i += 1
+            eneg = False
+            if i < size and (buf[i] == 45 or buf[i] == 43):
+                eneg = buf[i] == 45
+                i += 1
+            e = 0
+            edigit = 0
+            while i < size and 48 <= buf[i] <= 57:
+                if e < 100000:
+                    e = e*10 + (buf[i]-48)
+                edigit += 1
+                i += 1
+            if edigit == 0:
+                return -1
+            q += -e if eneg else e
+
+        if i < size and not (buf[i] == 32 or 9 <= buf[i] <= 13):
+            return -1
+        if n == out.size:
+            return -1
+
+        bits = _to_double_bits(w, q, pow5)
+        if bits == np.uint64(0xFFFFFFFFFFFFFFFF):
+            return -1
+        out[n] = bits | sign if neg else bits
+        n += 1
+
+    return n
+
+
+if njit is not None:
+    _POW5 = _pow5_table()
+    _mul128 = njit(cache=True, nogil=True)(_mul128)
+    _to_double_bits = njit(cache=True, nogil=True)(_to_double_bits)
+    _parse_ascii = njit(cache=True, nogil=True)(_parse_ascii)
+
+
+def _read_ascii(file, count=None, dtype=np.float64):
+    """read whitespace-separated ASCII output of fermi.f into a flat array.
+
+    If numba is installed, the raw bytes are tokenized by a compiled kernel, which is
+    several times faster than np.fromfile(sep=" ") on large grids and gives identical
+    values. Otherwise, or if the content is not recognized (e.g. NaN), np.fromfile is
+    used, which accepts any whitespace layout.
+
+    Args:
+        file: str
+            path to the ASCII file.
+        count: int, optional
+            the expected number of values, used to preallocate the output.
+        dtype: data-type, optional
+            the dtype of the output. Default is numpy.float64.
+
+    Returns:
+        data: numpy.ndarray
+            1D array of all values in the file, in the order they are written.
+    """
+
+    if njit is not None:
+        buf = np.fromfile(file, dtype=np.uint8)
+        # every value takes at least one digit and one separator.
+        out = np.empty(buf.size//2+1 if count is None else count, dtype=np.float64)
+        n = _parse_ascii(buf, out.view(np.uint64), _POW5)
+        if n >= 0:
+            data = out[:n] if count is not None else out[:n].copy()
+            return data.astype(dtype, copy=False)
+        mylog.debug(f"unrecognized format of {file}, fall back to np.fromfile")
+
+    return np.fromfile(file, sep=" ").astype(dtype, copy=False)
 
 
+_inp_cache = {}  # parsed header of fermi.inp, keyed by (realpath, mtime)
+
+
+def _parse_inp(path):
+    """parse the header fields of fermi.inp.
+
+    Only the lines holding the fields are scanned, the rest of the file is not read.
+
+    Args:
+        path: str
+            path to fermi.inp.
+
+    Returns:
+        bc, iezone, ilzone, ezone, kprint: list, int, int, float, numpy.ndarray
+    """
+
+    i = -1
+    with open(path,'r') as f:
+        for i, line in enumerate(f):
+            if i == 0:
+                bc = line.split()[:4]
+            elif i == 2:
+                dims = line.split()
+            elif i == 20:
+                kprint = np.append('0',line.split()[:-1])
+                break
+        else:
+            raise ValueError(f"{path} has only {i+1} lines, the output times are expected on line 21.")
+
+    return bc, int(dims[0]), int(dims[1]), float(dims[2]), kprint
+
 
 class FermiData(object):
     """Tools for reading output data of fermi.f
@@ -67,6 +338,11 @@ class FermiData(object):
     Used for reading output data of fermi.f, including the dimension and size of meshgrid,
     variable outputs and logging files.
 
+    Outputs are cached on the instance, so repeated reads share the same buffer. Only
+    the cache_size most recently used outputs are kept, clear_cache() drops them all.
+    Arrays are returned read-only to protect the cache, call .copy() on them before
+    modifying in place.
+
     Args:
         dirpath: str, optional
             Directory path to be loaded. Default is './', which assumes the you work in
@@ -87,25 +363,32 @@ class FermiData(object):
             the resolution for the even spaced grids.
         kprint: list
             list of time (year) for output.
+        cache_size: int
+            the number of outputs kept in the cache. Default is 32.
+        input: list
+            lines of fermi.inp, read from the file on access.
 
     Example:
         >>> data = FermiData(dirpath='./data/fermi/')
     """
 
+    cache_size = 32
+
     def __init__(self, dirpath='./'):
         self.dir_path = os.path.abspath(dirpath)
+        self._cache = OrderedDict()  # parsed outputs in LRU order, keyed by what was read
+        self._cache_lock = threading.Lock()
         mylog.info(f'Import data from {self.dir_path}')
 
-        with open(self.dir_path+'/fermi.inp','r') as f:
-            self.input = f.readlines()
-            self.bc = self.input[0].split()[:4]
-            dims = self.input[2].split()
-            self.iezone = int(dims[0])
-            self.ilzone = int(dims[1])
-            self.ezone = float(dims[2])
-            self.izone = self.iezone + self.ilzone
-            self.reso = self.ezone/self.iezone
-            self.kprint = np.append('0',self.input[20].split()[:-1])
+        inp = os.path.realpath(self.dir_path+'/fermi.inp')
+        key = (inp, os.path.getmtime(inp))
+        if key not in _inp_cache:
+            _inp_cache[key] = _parse_inp(inp)
+        bc, self.iezone, self.ilzone, self.ezone, kprint = _inp_cache[key]
+        self.bc = list(bc)
+        self.izone = self.iezone + self.ilzone
+        self.reso = self.ezone/self.iezone
+        self.kprint = kprint.copy()
 
         mylog.info(PARA.format("bundary_condition",f"{self.bc}"))
         mylog.info(PARA.format("equally_spaced_grids",f"{self.iezone}"))
@@ -115,6 +398,47 @@ class FermiData(object):
         mylog.info(PARA.format("time_series",f"{self.kprint}"))
 
 
+    def _cache_get(self, key):
+        """return the cached output for key and mark it as recently used, None if absent."""
+
+        with self._cache_lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+
+    def _cache_put(self, key, value):
+        """cache an output, dropping the least recently used ones beyond cache_size."""
+
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+    def clear_cache(self):
+        """drop all cached outputs of this instance.
+
+        Example:
+            >>> data = FermiData(dirpath='./data/fermi/')
+            >>> den = data.read_var('den', 1)
+            >>> data.clear_cache()  # den stays valid, but is no longer held by data
+        """
+
+        with self._cache_lock:
+            self._cache.clear()
+
+
+    @property
+    def input(self):
+        """list of lines of fermi.inp, read from the file on access."""
+
+        with open(self.dir_path+'/fermi.inp','r') as f:
+            return f.readlines()
+
+
     def read_inp(self , row, col):
         """read parameter from input file.
 
@@ -132,8 +456,14 @@ class FermiData(object):
             >>> data = FermiData(dirpath='./data/fermi/')
             >>> data.read_inp(1,3) # Read the parameter at the 2nd row and the 4th colume.
         """
-        line = self.input[row].split()
-        para = line[col]
+        if row < 0:
+            line = self.input[row]
+        else:
+            with open(self.dir_path+'/fermi.inp','r') as f:
+                line = next(itertools.islice(f, row, row+1), None)
+            if line is None:
+                raise IndexError(f"fermi.inp has no row {row}.")
+        para = line.split()[col]
 
         return para
 
@@ -147,7 +477,8 @@ class FermiData(object):
 
         Returns:
             x: numpy.ndarray
-                1D coordinate in the unit of kpc.
+                1D coordinate in the unit of kpc. The array is cached on the instance
+                and is read-only, copy it before modifying in place.
 
         Example:
             >>> data = FermiData(dirpath='./data/fermi/')
@@ -155,9 +486,17 @@ class FermiData(object):
             >>> data.read_coord('x')  # Read volume-boundary coordinate
         """
 
+        key = ('coord', var)
+        x = self._cache_get(key)
+        if x is not None:
+            return x
+
         filename = f"{self.dir_path}/{var}ascii.out"
 
-        x = np.fromfile(filename,sep=" ") * u.cm.to(u.kpc)
+        x = _read_ascii(filename)
+        x *= _CM_TO_KPC
+        x.setflags(write=False)
+        self._cache_put(key, x)
         mylog.info(DIME.format(f"import {var}",f"{x.shape}"))
         return x
 
@@ -216,20 +555,35 @@ class FermiData(object):
         return rh
 
         
-    def read_var(self, var, kprint):
+    def read_var(self, var, kprint, dtype=None):
         """read '*ascii.out*' variable outputs.
 
         Transfrom the variable output to an array according to the index.
 
+        If the raw binary counterpart '*bin.out*' exists and holds exactly izone*izone
+        values, it is memory-mapped instead of parsing the ASCII file. fermi.f writes it
+        with, e.g. for den at kprint 1,
+
+            open(21, file='denbin.out1', form='unformatted', access='stream')
+            write(21) den
+            close(21)
+
+        where den is the real*8 array written to 'denascii.out1', in native (little)
+        endianness. Initial values go to '*atmbin.out'.
+
         Args:
             var: str
                 the variable name of output, the prefix of variable output file to read.
             kprint: int
                 the kprint of output. 0 for initial value.
+            dtype: data-type, optional
+                the dtype of the returned array. Default is the module-level vardtype.
 
         Returns:
             data: numpy.ndarray
-                data[0,0] corresponds to [zmax, 0], data[-1,-1] corresponds to [0, rmax]
+                data[0,0] corresponds to [zmax, 0], data[-1,-1] corresponds to [0, rmax].
+                The array is cached on the instance and is read-only, copy it before
+                modifying in place.
 
         Example:
             >>> data = FermiData('./data/fermi/')
@@ -241,19 +595,79 @@ class FermiData(object):
         if var == 'ur':
             var = 'uy'
 
+        dtype = np.dtype(vardtype if dtype is None else dtype)
+        key = ('var', var, kprint, dtype)
+        data = self._cache_get(key)
+        if data is not None:
+            return data
+
         if kprint == 0:
             filename = f"{var}atmascii.out"
+            binname = f"{var}atmbin.out"
         else:
             filename = f"{var}ascii.out{kprint}"
+            binname = f"{var}bin.out{kprint}"
 
         file = f"{self.dir_path}/{filename}"
+        binfile = f"{self.dir_path}/{binname}"
+
+        usebin = os.path.exists(binfile)
+        # sequential unformatted files carry record markers, which would shift every value.
+        if usebin and os.path.getsize(binfile) != self.izone*self.izone*8:
+            mylog.warning(f"{binname} does not hold exactly {self.izone}x{self.izone} float64 values "
+                          f"(written without access='stream'?), read {filename} instead.")
+            usebin = False
+
+        if usebin:
+            data = np.memmap(binfile, dtype='<f8', mode='r', shape=(self.izone*self.izone,))
+            if data.dtype != dtype:
+                data = data.astype(dtype)
+        else:
+            data = _read_ascii(file, count=self.izone*self.izone, dtype=dtype)
+        # the statistics cost two full passes, only pay for them when they are logged.
+        # numpy's vectorized min and max are faster than a fused single-pass loop in numba.
+        if mylog.isEnabledFor(logging.INFO):
+            mylog.info(PROP.format(f"import {var}{kprint}(min, max)",f"({data.min()}, {data.max()})"))
+        data = data.reshape((self.izone,self.izone), order='F')  # fortran writes column-major
+        data.setflags(write=False)
+        self._cache_put(key, data)
 
-        data = np.fromfile(file,dtype=float,sep=" ")
-        dmax = data.max()
-        dmin = data.min()
-        data = data.reshape([self.izone,self.izone])
-        data = data.T  # reverse index from fortran
-        mylog.info(PROP.format(f"import {var}{kprint}(min, max)",f"({dmin}, {dmax})"))
+        return data
+
+
+    def read_var_bulk(self, var, kprints, dtype=None):
+        """read '*ascii.out*' variable outputs of several kprints in parallel.
+
+        Each output is read by FermiData.read_var() in a thread pool. Both the numba
+        kernel and pandas' C tokenizer release the GIL while parsing, and binary outputs
+        are only memory-mapped, so threads are enough to use all cores.
+
+        Args:
+            var: str
+                the variable name of output, the prefix of variable output file to read.
+            kprints: list of int
+                the kprints of outputs. 0 for initial value.
+            dtype: data-type, optional
+                the dtype of the returned arrays. Default is the module-level vardtype.
+
+        Returns:
+            data: dict
+                data[k] is the output of kprint k, the same read-only array as returned
+                by FermiData.read_var(), so no extra copy is made. Empty if kprints is.
+
+        Example:
+            >>> data = FermiData('./data/fermi/')
+            >>> den = data.read_var_bulk('den', range(1, 6))
+            >>> den[3]
+        """
+
+        kprints = list(kprints)
+        if not kprints:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(len(kprints), os.cpu_count() or 1)) as executor:
+            arrs = executor.map(lambda k: self.read_var(var, k, dtype=dtype), kprints)
+            data = dict(zip(kprints, arrs))
 
         return data
 
@@ -270,11 +684,18 @@ class FermiData(object):
 
         Returns:
             df : pandas.DataFrame
+                cached on the instance, copy it before modifying in place.
         """
 
+        key = ('hist', var, skiprows)
+        df = self._cache_get(key)
+        if df is not None:
+            return df
+
         mylog.info(PROP.format(f"import {var}c.out", f"skiprows={skiprows})"))
         path = f"{self.dir_path}/{var}c.out"
-        df = pd.read_csv(path,skiprows=skiprows,delim_whitespace=True,index_col='tyr')
+        df = pd.read_csv(path,skiprows=skiprows,sep=r'\s+',engine='c',index_col='tyr')
+        self._cache_put(key, df)
 
         return df
 
@@ -292,6 +713,7 @@ def meshgrid(coord,rrange,zrange):
 
     Returns:
         R, z: numpy.ndarray, numpy.ndarray
+            read-only broadcast views, use numpy.ascontiguousarray() for writable grids.
 
     Example:
         >>> data = FermiData(dirpath='./data/fermi/')
@@ -299,11 +721,17 @@ def meshgrid(coord,rrange,zrange):
         >>> meshgrid(xh, 100, 100)
     """
 
-    mylog.info(f"====> call function {sys._getframe().f_code.co_name}(data, rrange={rrange}, zrange={zrange})")
-    z = coord[np.where(coord<=zrange)]
-    R = coord[np.where(coord<=rrange)]
-    RR = np.hstack((-R[::-1],R))
-    R,z = np.meshgrid(RR,z)
+    mylog.debug(f"====> call function meshgrid(data, rrange={rrange}, zrange={zrange})")
+    # coordinates are monotonically increasing, so the cut is a prefix of the array.
+    nz = np.searchsorted(coord, zrange, side='right')
+    nr = np.searchsorted(coord, rrange, side='right')
+
+    RR = np.empty(2*nr, dtype=coord.dtype)
+    np.negative(coord[:nr][::-1], out=RR[:nr])
+    RR[nr:] = coord[:nr]
+
+    R = np.broadcast_to(RR, (nz, 2*nr))
+    z = np.broadcast_to(coord[:nz, None], (nz, 2*nr))
     mylog.info(DIME.format('xh', f'z-{R.shape[0]} R-{R.shape[1]}'))
 
     return R, z
@@ -337,17 +765,21 @@ def mesh_var(data, meshgrid, flip=False):
     zrange = meshgrid.shape[0]
     rrange = int(meshgrid.shape[1]/2)
 
-    mylog.info(f"====> calling function [mesh_var]: construct the region within {meshgrid.max()} kpc.")
+    if mylog.isEnabledFor(logging.DEBUG):
+        mylog.debug(f"====> calling function [mesh_var]: construct the region within {meshgrid.max()} kpc.")
 
     meshr = data[:zrange,:rrange]
 
+    # write both halves into one allocation, the left half is the horizontal mirror.
+    h, w = meshr.shape
+    mesh = np.empty((h, 2*w), dtype=meshr.dtype)
+    mesh[:, w:] = meshr
+
     # the horizontal mirror of r-velocity should be in opposite direction.
     if flip:
-        meshl = -np.fliplr(meshr)
+        np.negative(meshr[:, ::-1], out=mesh[:, :w])
     else:
-        meshl = np.fliplr(meshr)
-
-    mesh = np.hstack((meshl,meshr))
+        mesh[:, :w] = meshr[:, ::-1]
 
     mylog.info(DIME.format(f'mesh_var', f'z-{mesh.shape[0]}, R-{mesh.shape[1]}'))
 
@@ -380,7 +812,7 @@ def slice_mesh(data, coord, direction='z', offset=0):
     """
 
     nu = find_nearst(coord, offset)
-    mylog.info(PARA.format('slice coordinate',coord[nu]*u.cm.to(u.kpc)))
+    mylog.info(PARA.format('slice coordinate',coord[nu]*_CM_TO_KPC))
 
     n_constant = 5.155e23  # num_den_electron = den * n_constant
 
@@ -394,6 +826,44 @@ def slice_mesh(data, coord, direction='z', offset=0):
         raise ValueError("Only 'z' and 'R' are allowed.")
 
 
+def slice_mesh_batch(data, coord, direction='z', offsets=(0,)):
+    """slice meshgrid array at several distances at once.
+
+    vectorized version of slice_mesh(), extract data at given direction for each given
+    distance in one indexing operation.
+
+    Args:
+        data : numpy.ndarray
+            the numpy.ndarray from FermiData.read_var(var,kprint).
+        coord : numpy.ndarray
+            the numpy.ndarray from FermiData.read_coord(var).
+        direction : str
+            the direction of slice. The value can be 'z' or 'R'. Default is 'z'.
+        offsets : array_like
+            distances to the axis in unit of 'kpc'. Default is (0,).
+
+    Returns:
+        data: numpy.ndarray
+            data[i] is the slice at offsets[i].
+
+    Example:
+        >>> data = FermiData(dirpath='./data/fermi/')
+        >>> xh = data.read_coord('xh')
+        >>> den1 = data.read_var('den', 1)
+        >>> den1_slices = slice_mesh_batch(den1, xh, direction='R', offsets=[0, 10, 20])
+    """
+
+    nu = find_nearst_many(coord, offsets)
+    mylog.info(PARA.format('slice coordinates',f"{coord[nu]}"))
+
+    if direction == 'z':
+        return data.T[nu]  # gather rows of the transpose, each slice is contiguous
+    elif direction == 'R':
+        return data[nu,:]
+    else:
+        raise ValueError("Only 'z' and 'R' are allowed.")
+
+
 def cumsum(data, den, weight='mass', direction='r', interval=1):
     """ Return the cumulative sum of the elements along a given direction.
 
@@ -938,18 +1408,42 @@ def find_nearst(arr,target):
     Given a number, find out the index of the nearest element in an 1D array.
 
     Args:
-        arr: array for searching
+        arr: array for searching, sorted in ascending order
         target: target number
     """
 
-    index = np.abs(arr-target).argmin()
-    return index
+    i = np.searchsorted(arr, target)
+    if i == 0:
+        return 0
+    if i == len(arr):
+        return len(arr)-1
+    return i-1 if abs(arr[i-1]-target) <= abs(arr[i]-target) else i
+
+def find_nearst_many(arr,targets):
+    """get the indices of nearest values
+
+    Vectorized version of find_nearst(), find out the index of the nearest element in
+    an 1D array for each given number.
+
+    Args:
+        arr: array for searching, sorted in ascending order
+        targets: array of target numbers
+    """
+
+    targets = np.asarray(targets)
+    if len(arr) == 1:
+        return np.zeros(targets.shape, dtype=np.intp)
+    i = np.clip(np.searchsorted(arr, targets), 1, len(arr)-1)
+    left = np.abs(arr[i-1]-targets) <= np.abs(arr[i]-targets)
+    return np.where(left, i-1, i)
+
+_fmt_float = "{0:.2g}".format
 
 def latex_float(f):
-    float_str = "{0:.2g}".format(f)
-    if "e" in float_str:
-        base, exponent = float_str.split("e")
-        return r"{0} \times 10^{{{1}}}".format(base, int(exponent))
+    float_str = _fmt_float(f)
+    i = float_str.find("e")
+    if i >= 0:
+        return rf"{float_str[:i]} \times 10^{{{int(float_str[i+1:])}}}"
     else:
         return float_str
 
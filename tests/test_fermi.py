@@ -0,0 +1,191 @@
+"""Tests for fermi.py, run with the parent directory of skpy on the PYTHONPATH."""
+
+import numpy as np
+import pytest
+from skpy import fermi
+
+
+def write_ascii(path, values, per=6):
+    """write values the way fermi.f does, `per` E-format values in each record."""
+    lines = [''.join(f' {v:.5E}' for v in values[i:i+per]) for i in range(0, len(values), per)]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def wide_range_values(n=20000, seed=0):
+    """positive and negative values with exponents across the whole double range."""
+    rng = np.random.default_rng(seed)
+    values = rng.random(n) * 10.0**rng.integers(-307, 308, n)
+    values[::3] *= -1
+    return values
+
+
+@pytest.fixture
+def no_numba(monkeypatch):
+    monkeypatch.setattr(fermi, 'njit', None)
+
+
+@pytest.fixture
+def fermi_dir(tmp_path):
+    """a minimal output directory with 6 even and 4 logarithmic spaced grids."""
+    lines = ['reflect reflect outflow outflow', '', '6 4 3.0', *[''] * 17, '1e6 2e6 end']
+    (tmp_path / 'fermi.inp').write_text('\n'.join(lines) + '\n')
+    x = np.linspace(0, 10, 11) / fermi._CM_TO_KPC
+    write_ascii(tmp_path / 'xascii.out', x, per=1)
+    den = np.arange(100, dtype=np.float64)
+    write_ascii(tmp_path / 'denascii.out1', den)
+    return tmp_path
+
+
+def test_read_ascii_fallback_matches_fromfile(tmp_path, no_numba):
+    file = write_ascii(tmp_path / 'denascii.out1', wide_range_values(n=20003))
+    data = fermi._read_ascii(file)
+    expected = np.fromfile(file, sep=' ')
+    np.testing.assert_array_equal(data.view(np.uint64), expected.view(np.uint64))
+
+
+def test_parse_ascii_matches_fromfile(tmp_path):
+    pytest.importorskip('numba')
+    values = wide_range_values(n=100003)
+    values[:6] = [0.0, 5e-324, 2.2250738585072014e-308, 1.7976931348623157e308, 1e23, 2**53+2]
+    file = write_ascii(tmp_path / 'denascii.out1', values)
+    expected = np.fromfile(file, sep=' ')
+
+    # make sure the compiled kernel parsed everything, rather than the np.fromfile fallback.
+    buf = np.fromfile(file, dtype=np.uint8)
+    out = np.empty(expected.size, dtype=np.float64)
+    assert fermi._parse_ascii(buf, out.view(np.uint64), fermi._POW5) == expected.size
+    np.testing.assert_array_equal(out.view(np.uint64), expected.view(np.uint64))
+
+    data = fermi._read_ascii(file, count=expected.size)
+    np.testing.assert_array_equal(data.view(np.uint64), expected.view(np.uint64))
+
+
+def test_read_ascii_fallback_single_column_is_writable(tmp_path, no_numba):
+    file = write_ascii(tmp_path / 'xascii.out', np.linspace(0, 1e23, 11), per=1)
+    data = fermi._read_ascii(file)
+    assert data.flags.writeable
+
+
+@pytest.mark.parametrize('numba', [True, False])
+def test_read_var_keeps_nan_in_last_record(fermi_dir, monkeypatch, numba):
+    if not numba:
+        monkeypatch.setattr(fermi, 'njit', None)
+    den = np.arange(100, dtype=np.float64)
+    den[-1] = np.nan
+    write_ascii(fermi_dir / 'denascii.out1', den)
+    data = fermi.FermiData(fermi_dir).read_var('den', 1)
+    np.testing.assert_array_equal(data, den.reshape((10, 10), order='F'))
+
+
+@pytest.mark.parametrize('numba', [True, False])
+def test_read_ascii_ragged_records(tmp_path, monkeypatch, numba):
+    if not numba:
+        monkeypatch.setattr(fermi, 'njit', None)
+    values = np.arange(100, dtype=np.float64)
+    # records of 6 then 4 values, and a short first record.
+    lines = [' '.join(f'{v:.5E}' for v in values[:2])]
+    for i in range(2, 100, 10):
+        lines += [' '.join(f'{v:.5E}' for v in values[i:i+6]), ' '.join(f'{v:.5E}' for v in values[i+6:i+10])]
+    file = tmp_path / 'xascii.out'
+    file.write_text('\n'.join(lines) + '\n')
+    data = fermi._read_ascii(str(file))
+    np.testing.assert_array_equal(data, values)
+
+
+def test_read_coord_one_value_per_line(fermi_dir, no_numba):
+    x = fermi.FermiData(fermi_dir).read_coord('x')
+    np.testing.assert_allclose(x, np.linspace(0, 10, 11), rtol=1e-5)
+
+
+def test_read_var_prefers_stream_binary(fermi_dir):
+    den = np.arange(100, dtype=np.float64)
+    (den * 2).astype('<f8').tofile(fermi_dir / 'denbin.out1')
+    data = fermi.FermiData(fermi_dir).read_var('den', 1)
+    np.testing.assert_array_equal(data, 2 * den.reshape((10, 10), order='F'))
+
+
+def test_read_var_ignores_binary_with_record_markers(fermi_dir):
+    den = np.arange(100, dtype=np.float64)
+    marker = np.array([den.nbytes], dtype='<i4').tobytes()
+    (fermi_dir / 'denbin.out1').write_bytes(marker + (den * 2).astype('<f8').tobytes() + marker)
+    data = fermi.FermiData(fermi_dir).read_var('den', 1)
+    np.testing.assert_array_equal(data, den.reshape((10, 10), order='F'))
+
+
+def test_cache_is_bounded_and_clearable(fermi_dir, monkeypatch):
+    monkeypatch.setattr(fermi.FermiData, 'cache_size', 2)
+    data = fermi.FermiData(fermi_dir)
+    den = data.read_var('den', 1)
+    x = data.read_coord('x')
+    assert data.read_var('den', 1) is den
+    assert not den.flags.writeable
+
+    data.read_var('den', 1, dtype=np.float32)  # evicts the least recently used, x
+    assert data.read_var('den', 1) is den
+    assert data.read_coord('x') is not x
+
+    data.clear_cache()
+    assert data.read_var('den', 1) is not den
+
+
+def test_read_var_bulk(fermi_dir):
+    data = fermi.FermiData(fermi_dir)
+    assert data.read_var_bulk('den', []) == {}
+    bulk = data.read_var_bulk('den', [1])
+    assert list(bulk) == [1]
+    assert bulk[1] is data.read_var('den', 1)
+
+
+def test_read_inp(fermi_dir):
+    data = fermi.FermiData(fermi_dir)
+    assert data.read_inp(2, 1) == '4'
+    assert data.read_inp(-1, 0) == '1e6'
+    assert data.input[0].split()[0] == 'reflect'
+    with pytest.raises(IndexError):
+        data.read_inp(50, 0)
+
+
+def test_short_inp_is_reported(tmp_path):
+    (tmp_path / 'fermi.inp').write_text('reflect\n\n6 4 3.0\n')
+    with pytest.raises(ValueError, match='only 3 lines'):
+        fermi.FermiData(tmp_path)
+
+
+@pytest.mark.parametrize('direction', ['z', 'R'])
+def test_slice_mesh_batch(fermi_dir, direction):
+    data = fermi.FermiData(fermi_dir)
+    den = data.read_var('den', 1)
+    coord = np.linspace(0.5, 9.5, 10)
+    offsets = [0, 3.1, 7]
+    batch = fermi.slice_mesh_batch(den, coord, direction=direction, offsets=offsets)
+    assert batch.flags.c_contiguous
+    for row, offset in zip(batch, offsets):
+        np.testing.assert_array_equal(row, fermi.slice_mesh(den, coord, direction=direction, offset=offset))
+
+
+@pytest.mark.parametrize('arr', [[1.0], [1.0, 2.0], np.linspace(0, 10, 11)])
+def test_find_nearst_many_matches_find_nearst(arr):
+    arr = np.asarray(arr)
+    targets = [-5, 0.3, 1.5, 2.0, 4.5, 50]
+    assert list(fermi.find_nearst_many(arr, targets)) == [fermi.find_nearst(arr, t) for t in targets]
+
+
+@pytest.mark.parametrize('rrange, zrange', [(5, 7), (4.5, 4.5), (0.1, 100), (100, 0.1)])
+def test_meshgrid_matches_np_meshgrid(rrange, zrange):
+    coord = np.linspace(0.5, 9.5, 10)
+    R, z = fermi.meshgrid(coord, rrange, zrange)
+    Rc, zc = coord[coord <= rrange], coord[coord <= zrange]
+    expected_R, expected_z = np.meshgrid(np.hstack((-Rc[::-1], Rc)), zc)
+    np.testing.assert_array_equal(R, expected_R)
+    np.testing.assert_array_equal(z, expected_z)
+    assert not R.flags.writeable and not z.flags.writeable
+
+
+@pytest.mark.parametrize('flip', [False, True])
+def test_mesh_var_matches_hstack(flip):
+    data = np.arange(100, dtype=np.float64).reshape((10, 10), order='F')
+    R, _ = fermi.meshgrid(np.linspace(0.5, 9.5, 10), 5, 7)
+    meshr = data[:R.shape[0], :R.shape[1]//2]
+    meshl = -np.fliplr(meshr) if flip else np.fliplr(meshr)
+    np.testing.assert_array_equal(fermi.mesh_var(data, R, flip=flip), np.hstack((meshl, meshr)))